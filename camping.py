@@ -3,13 +3,17 @@
 
 import json
 import logging
+import os
 import sys
 from collections import defaultdict
-from datetime import datetime, timedelta
-from itertools import count, groupby
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from functools import lru_cache
 
+import orjson
 from dateutil import rrule
 
+from clients.http_session import MAX_CONNECTIONS
 from clients.recreation_client import RecreationClient
 from enums.date_format import DateFormat
 from enums.emoji import Emoji
@@ -24,9 +28,30 @@ sh = logging.StreamHandler()
 sh.setFormatter(log_formatter)
 LOG.addHandler(sh)
 
+# Upper bound on concurrent requests to recreation.gov. One worker per pooled
+# connection, so no request has to open a connection that is then discarded.
+MAX_WORKERS = MAX_CONNECTIONS
+
+
+def get_months(start_date, end_date):
+    """
+    Returns the first of each month in the range we care about, which is what
+    the availability endpoint must be queried with.
+    """
+    start_of_month = datetime(start_date.year, start_date.month, 1)
+    return list(
+        rrule.rrule(rrule.MONTHLY, dtstart=start_of_month, until=end_date)
+    )
+
 
 def get_park_information(
-    park_id, start_date, end_date, campsite_type=None, campsite_ids=(), excluded_site_ids=[]
+    park_id,
+    start_date,
+    end_date,
+    campsite_type=None,
+    campsite_ids=(),
+    excluded_site_ids=frozenset(),
+    api_data=None,
 ):
     """
     This function consumes the user intent, collects the necessary information
@@ -48,55 +73,55 @@ def get_park_information(
 
     Notably, the output doesn't tell you which sites are available. The rest of
     the script doesn't need to know this to determine whether sites are available.
-    """
 
-    # Get each first of the month for months in the range we care about.
-    start_of_month = datetime(start_date.year, start_date.month, 1)
-    months = list(
-        rrule.rrule(rrule.MONTHLY, dtstart=start_of_month, until=end_date)
-    )
+    If the caller has already fetched the months returned by `get_months`, it
+    can pass them as `api_data` instead of having them fetched here.
+    """
 
     # Get data for each month.
-    api_data = []
-    for month_date in months:
-        api_data.append(RecreationClient.get_availability(park_id, month_date))
+    if api_data is None:
+        api_data = [
+            RecreationClient.get_availability(park_id, month_date)
+            for month_date in get_months(start_date, end_date)
+        ]
 
     # Collapse the data into the described output format.
     # Filter by campsite_type if necessary.
     data = {}
+    campsite_ids = (
+        frozenset(int(c) for c in campsite_ids) if campsite_ids else None
+    )
+    excluded_site_ids = frozenset(excluded_site_ids)
 
     for month_data in api_data:
         for campsite_id, campsite_data in month_data["campsites"].items():
             if campsite_id in excluded_site_ids:
                 continue
-            available = []
             a = data.setdefault(campsite_id, [])
-            for date, availability_value in campsite_data[
-                "availabilities"
-            ].items():
-                if availability_value != "Available":
-                    continue
 
-                if (
-                    campsite_type
-                    and campsite_type != campsite_data["campsite_type"]
-                ):
+            # These filters only depend on the site, so check them once here
+            # rather than for every date.
+            if (
+                campsite_type
+                and campsite_type != campsite_data["campsite_type"]
+            ):
+                continue
+            if campsite_ids is not None:
+                cs_id_int = int(campsite_data["campsite_id"])
+                if cs_id_int not in campsite_ids:
                     continue
 
-                if (
-                    len(campsite_ids) > 0
-                    and int(campsite_data["campsite_id"]) not in campsite_ids
-                ):
+            for day, availability_value in campsite_data[
+                "availabilities"
+            ].items():
+                if availability_value != "Available":
                     continue
-
-                available.append(date)
-            if available:
-                a += available
+                a.append(day)
 
     return data
 
-def is_weekend(date):
-    weekday = date.weekday()
+def is_weekend(day):
+    weekday = day.weekday()
 
     return weekday == 4 or weekday == 5
 
@@ -108,15 +133,12 @@ def get_num_available_sites(
 
     num_available = 0
     num_days = (end_date - start_date).days
-    dates = [end_date - timedelta(days=i) for i in range(1, num_days + 1)]
+    start_ordinal = start_date.toordinal()
+    days = range(start_ordinal, start_ordinal + num_days)
     if weekends_only:
-        dates = filter(is_weekend, dates)
-    dates = set(
-        formatter.format_date(
-            i, format_string=DateFormat.ISO_DATE_FORMAT_RESPONSE.value
-        )
-        for i in dates
-    )
+        days = (o for o in days if is_weekend(date.fromordinal(o)))
+    # Keys in the API's ISO_DATE_FORMAT_RESPONSE, e.g. 2022-06-22T00:00:00Z.
+    dates = {date.fromordinal(o).isoformat() + "T00:00:00Z" for o in days}
 
     if nights not in range(1, num_days + 1):
         nights = num_days
@@ -127,10 +149,10 @@ def get_num_available_sites(
         # List of dates that are in the desired range for this site.
         desired_available = []
 
-        for date in availabilities:
-            if date not in dates:
+        for day in availabilities:
+            if day not in dates:
                 continue
-            desired_available.append(date)
+            desired_available.append(day)
 
         if not desired_available:
             continue
@@ -161,48 +183,73 @@ def consecutive_nights(available, nights):
     date range for this site that is available.
     """
     ordinal_dates = [
-        datetime.strptime(
-            dstr, DateFormat.ISO_DATE_FORMAT_RESPONSE.value
-        ).toordinal()
-        for dstr in available
+        formatter.parse_response_date(dstr).toordinal() for dstr in available
     ]
-    c = count()
-
-    consecutive_ranges = list(
-        list(g) for _, g in groupby(ordinal_dates, lambda x: x - next(c))
-    )
+    # Every start/end we can emit is an available night or the morning after
+    # one, so format each of those once instead of once per range.
+    nice_by_ordinal = {
+        o: formatter.format_date(
+            datetime.fromordinal(o),
+            format_string=DateFormat.INPUT_DATE_FORMAT.value,
+        )
+        for o in set(ordinal_dates) | {o + 1 for o in ordinal_dates}
+    }
+    # Split into runs of consecutive days.
+    consecutive_ranges = []
+    current = []
+    for o in ordinal_dates:
+        if current and o != current[-1] + 1:
+            consecutive_ranges.append(current)
+            current = []
+        current.append(o)
+    if current:
+        consecutive_ranges.append(current)
 
     long_enough_consecutive_ranges = []
     for r in consecutive_ranges:
         # Skip ranges that are too short.
         if len(r) < nights:
             continue
-        for start_index in range(0, len(r) - nights + 1):
-            start_nice = formatter.format_date(
-                datetime.fromordinal(r[start_index]),
-                format_string=DateFormat.INPUT_DATE_FORMAT.value,
-            )
-            end_nice = formatter.format_date(
-                datetime.fromordinal(r[start_index + nights - 1] + 1),
-                format_string=DateFormat.INPUT_DATE_FORMAT.value,
-            )
-            long_enough_consecutive_ranges.append((start_nice, end_nice))
+        # Each start night pairs with the last night of its stay, so slice
+        # both ends of the run instead of indexing per start.
+        starts = r[: len(r) - nights + 1]
+        last_nights = r[nights - 1 :]
+        long_enough_consecutive_ranges.extend(
+            (nice_by_ordinal[start], nice_by_ordinal[last + 1])
+            for start, last in zip(starts, last_nights)
+        )
 
     return long_enough_consecutive_ranges
 
 
 def check_park(
-    park_id, start_date, end_date, campsite_type, campsite_ids=(), nights=None, weekends_only=False, excluded_site_ids=[],
+    park_id,
+    start_date,
+    end_date,
+    campsite_type,
+    campsite_ids=(),
+    nights=None,
+    weekends_only=False,
+    excluded_site_ids=frozenset(),
+    api_data=None,
+    park_name=None,
 ):
     park_information = get_park_information(
-        park_id, start_date, end_date, campsite_type, campsite_ids, excluded_site_ids=excluded_site_ids,
+        park_id,
+        start_date,
+        end_date,
+        campsite_type,
+        campsite_ids,
+        excluded_site_ids=excluded_site_ids,
+        api_data=api_data,
     )
     LOG.debug(
         "Information for park {}: {}".format(
             park_id, json.dumps(park_information, indent=2)
         )
     )
-    park_name = RecreationClient.get_park_name(park_id)
+    if park_name is None:
+        park_name = RecreationClient.get_park_name(park_id)
     current, maximum, availabilities_filtered = get_num_available_sites(
         park_information, start_date, end_date, nights=nights, weekends_only=weekends_only,
     )
@@ -240,10 +287,10 @@ def generate_human_output(
                         site_id=site_id
                     )
                 )
-                for date in dates:
+                for day in dates:
                     out.append(
                         "    * {start} -> {end}".format(
-                            start=date["start"], end=date["end"]
+                            start=day["start"], end=day["end"]
                         )
                     )
 
@@ -269,7 +316,10 @@ def generate_json_output(info_by_park_id):
             has_availabilities = True
             availabilities_by_park_id[park_id] = available_dates_by_site_id
 
-    return json.dumps(availabilities_by_park_id), has_availabilities
+    output = orjson.dumps(
+        availabilities_by_park_id, option=orjson.OPT_NON_STR_KEYS
+    ).decode()
+    return output, has_availabilities
 
 
 def remove_comments(lines: list[str]) -> list[str]:
@@ -286,28 +336,67 @@ def remove_comments(lines: list[str]) -> list[str]:
     return new_lines
 
 
+@lru_cache(maxsize=8)
+def load_excluded_site_ids(path, mtime):
+    """
+    Reads the site IDs from an exclusion file. `mtime` is only part of the
+    cache key, so an edited file is read again.
+    """
+    with open(path, "r") as f:
+        lines = [l.strip() for l in f.readlines()]
+    return frozenset(remove_comments(lines))
+
+
 def main(parks, json_output=False):
-    excluded_site_ids = []
+    excluded_site_ids = frozenset()
 
     if args.exclusion_file:
-        with open(args.exclusion_file, "r") as f:
-            excluded_site_ids = f.readlines()
-            excluded_site_ids = [l.strip() for l in excluded_site_ids]
-            excluded_site_ids = remove_comments(excluded_site_ids)
-
-    info_by_park_id = {}
-    for park_id in parks:
-        info_by_park_id[park_id] = check_park(
-            park_id,
-            args.start_date,
-            args.end_date,
-            args.campsite_type,
-            args.campsite_ids,
-            nights=args.nights,
-            weekends_only=args.weekends_only,
-            excluded_site_ids=excluded_site_ids,
+        excluded_site_ids = load_excluded_site_ids(
+            args.exclusion_file, os.path.getmtime(args.exclusion_file)
         )
 
+    # Queue every request for every park up front on one bounded pool, so at
+    # most MAX_WORKERS requests are in flight at once. Each park is processed
+    # as soon as its own months arrive.
+    months = get_months(args.start_date, args.end_date)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        try:
+            month_futures = {
+                park_id: [
+                    executor.submit(
+                        RecreationClient.get_availability, park_id, month_date
+                    )
+                    for month_date in months
+                ]
+                for park_id in parks
+            }
+            park_name_futures = {
+                park_id: executor.submit(
+                    RecreationClient.get_park_name, park_id
+                )
+                for park_id in parks
+            }
+            info_by_park_id = {
+                park_id: check_park(
+                    park_id,
+                    args.start_date,
+                    args.end_date,
+                    args.campsite_type,
+                    args.campsite_ids,
+                    nights=args.nights,
+                    weekends_only=args.weekends_only,
+                    excluded_site_ids=excluded_site_ids,
+                    api_data=[f.result() for f in month_futures[park_id]],
+                    park_name=park_name_futures[park_id].result(),
+                )
+                for park_id in parks
+            }
+        except BaseException:
+            # Fail as soon as one park does, rather than after every other
+            # queued request has run.
+            executor.shutdown(cancel_futures=True)
+            raise
+
     if json_output:
         output, has_availabilities = generate_json_output(info_by_park_id)
     else:
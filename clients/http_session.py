@@ -0,0 +1,32 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# The most connections kept open to a single host. camping.py and run.py use
+# this many workers, so it is also the most requests in flight at once.
+MAX_CONNECTIONS = 8
+
+# Seconds to wait for a server to respond before giving up on a request.
+REQUEST_TIMEOUT = 10
+
+# Shared by every outgoing request so connections are kept alive and reused
+# across recreation.gov and Telegram calls. Idempotent requests are retried
+# on transient failures and rate limiting.
+HTTP = requests.Session()
+HTTP.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=MAX_CONNECTIONS,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            # Hand the last response back so callers report the failure
+            # themselves, and never sleep for whatever Retry-After asks:
+            # a stalled run would overlap the next cron tick.
+            raise_on_status=False,
+            respect_retry_after_header=False,
+        ),
+    ),
+)
@@ -1,8 +1,9 @@
 import logging
 
-import requests
+import orjson
 import user_agent 
 
+from clients.http_session import HTTP, REQUEST_TIMEOUT
 from utils import formatter
 
 LOG = logging.getLogger(__name__)
@@ -17,6 +18,8 @@ class RecreationClient:
     MAIN_PAGE_ENDPOINT = BASE_URL + "/api/camps/campgrounds/{park_id}"
 
     headers = {"User-Agent": user_agent.generate_user_agent() }
+
+    session = HTTP
     
     @classmethod
     def get_availability(cls, park_id, month_date):
@@ -28,6 +31,41 @@ class RecreationClient:
         resp = cls._send_request(url, params)
         return resp
 
+    @classmethod
+    def get_availability_if_modified(
+        cls, park_id, month_date, etag=None, last_modified=None
+    ):
+        """
+        Like `get_availability`, but sends the validators from a previous
+        response so the server can skip the body if nothing changed.
+
+        Returns `(data, etag, last_modified)`, where `data` is None if the
+        server answered 304 Not Modified.
+        """
+        params = {"start_date": formatter.format_date(month_date)}
+        LOG.debug(
+            "Querying for {} with these params: {}".format(park_id, params)
+        )
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        url = cls.AVAILABILITY_ENDPOINT.format(park_id=park_id)
+        resp = cls._get(url, params, headers=headers, ok_statuses=(200, 304))
+        if resp.status_code == 304:
+            # A 304 may omit the validators; the ones we sent still apply.
+            return (
+                None,
+                resp.headers.get("ETag", etag),
+                resp.headers.get("Last-Modified", last_modified),
+            )
+        return (
+            orjson.loads(resp.content),
+            resp.headers.get("ETag"),
+            resp.headers.get("Last-Modified"),
+        )
+
     @classmethod
     def get_park_name(cls, park_id):
         resp = cls._send_request(
@@ -37,12 +75,22 @@ class RecreationClient:
 
     @classmethod
     def _send_request(cls, url, params):
-        resp = requests.get(url, params=params, headers=cls.headers)
-        if resp.status_code != 200:
+        resp = cls._get(url, params)
+        return orjson.loads(resp.content)
+
+    @classmethod
+    def _get(cls, url, params, headers=None, ok_statuses=(200,)):
+        resp = cls.session.get(
+            url,
+            params=params,
+            headers={**cls.headers, **(headers or {})},
+            timeout=REQUEST_TIMEOUT,
+        )
+        if resp.status_code not in ok_statuses:
             raise RuntimeError(
                 "failedRequest",
                 "ERROR, {status_code} code received from {url}: {resp_text}".format(
                     status_code=resp.status_code, url=url, resp_text=resp.text
                 ),
             )
-        return resp.json()
+        return resp
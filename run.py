@@ -1,20 +1,27 @@
 # -*- coding: utf-8 -*-
 #!/usr/bin/env python3
 
+import fcntl
+import hashlib
 import json
 import logging
+import re
 import sys
+import time
 from collections import defaultdict
-from datetime import datetime, timedelta
-from itertools import count, groupby
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from functools import lru_cache
 
 from dateutil import rrule
 
+from clients.http_session import HTTP, MAX_CONNECTIONS, REQUEST_TIMEOUT
 from clients.recreation_client import RecreationClient
 from enums.date_format import DateFormat
 from enums.emoji import Emoji
-from utils import formatter
+from utils import cache, formatter
 from utils.camping_argparser import CampingArgumentParser
+import orjson
 import os
 import requests
 
@@ -26,9 +33,102 @@ sh = logging.StreamHandler()
 sh.setFormatter(log_formatter)
 LOG.addHandler(sh)
 
+# Upper bound on concurrent requests to recreation.gov. One worker per pooled
+# connection, so no request has to open a connection that is then discarded.
+MAX_WORKERS = MAX_CONNECTIONS
+
+# Characters that must be escaped in Telegram's MarkdownV2 parse mode.
+MARKDOWN_ESCAPE_RE = re.compile(r"([_*\[\]()~`>#+\-=|{}.!])")
+
+# Identical notifications within this many seconds are only sent once.
+TELEGRAM_DEBOUNCE = 60
+
+# How long (in seconds) a cached availability month is trusted. Months that
+# have already ended can't change. Everything else is live data and by
+# default is revalidated on every run (see --cache-ttl).
+LIVE_MONTH_TTL = 0
+PAST_MONTH_TTL = 86400
+
+# Park names effectively never change.
+PARK_NAME_TTL = 365 * 86400
+
+
+def get_month_availability(park_id, month_date, live_ttl=LIVE_MONTH_TTL):
+    """
+    Wraps `RecreationClient.get_availability` with an on-disk cache keyed by
+    park and month, so frequent polling doesn't re-download unchanged data.
+
+    Current and future months are trusted for `live_ttl` seconds, months that
+    have already ended for `PAST_MONTH_TTL`. Once an entry goes stale it is
+    revalidated with a conditional request rather than downloaded again; if
+    the server says it hasn't changed, the cached copy is kept. A response
+    without validators is only cached if the TTL alone makes it reusable.
+    """
+    today = datetime.today()
+    if (month_date.year, month_date.month) < (today.year, today.month):
+        ttl = PAST_MONTH_TTL
+    else:
+        ttl = live_ttl
+
+    key = "availability-{}-{:%Y-%m}".format(park_id, month_date)
+    entry = cache.load(key)
+    if entry is not None and cache.is_fresh(key, ttl):
+        return entry["data"]
+
+    entry = entry or {}
+    result = RecreationClient.get_availability_if_modified(
+        park_id,
+        month_date,
+        etag=entry.get("etag"),
+        last_modified=entry.get("last_modified"),
+    )
+    month_data, etag, last_modified = result
+    if month_data is None:
+        LOG.debug("{} for park {} not modified.".format(key, park_id))
+        cache.touch(key)
+        return entry["data"]
+
+    if ttl > 0 or etag or last_modified:
+        cache.dump(
+            key,
+            {"data": month_data, "etag": etag, "last_modified": last_modified},
+        )
+    return month_data
+
+
+@lru_cache(maxsize=256)
+def get_park_name(park_id):
+    """
+    Wraps `RecreationClient.get_park_name` with an in-process and on-disk
+    cache, so each park's name is only fetched about once a year.
+    """
+    key = "park-name-{}".format(park_id)
+    park_name = cache.load(key, PARK_NAME_TTL)
+    if park_name is None:
+        park_name = RecreationClient.get_park_name(park_id)
+        cache.dump(key, park_name)
+    return park_name
+
+
+def get_months(start_date, end_date):
+    """
+    Returns the first of each month in the range we care about, which is what
+    the availability endpoint must be queried with.
+    """
+    start_of_month = datetime(start_date.year, start_date.month, 1)
+    return list(
+        rrule.rrule(rrule.MONTHLY, dtstart=start_of_month, until=end_date)
+    )
+
 
 def get_park_information(
-    park_id, start_date, end_date, campsite_type=None, campsite_ids=(), excluded_site_ids=[]
+    park_id,
+    start_date,
+    end_date,
+    campsite_type=None,
+    campsite_ids=(),
+    excluded_site_ids=frozenset(),
+    api_data=None,
 ):
     """
     This function consumes the user intent, collects the necessary information
@@ -50,55 +150,55 @@ def get_park_information(
 
     Notably, the output doesn't tell you which sites are available. The rest of
     the script doesn't need to know this to determine whether sites are available.
-    """
 
-    # Get each first of the month for months in the range we care about.
-    start_of_month = datetime(start_date.year, start_date.month, 1)
-    months = list(
-        rrule.rrule(rrule.MONTHLY, dtstart=start_of_month, until=end_date)
-    )
+    If the caller has already fetched the months returned by `get_months`, it
+    can pass them as `api_data` instead of having them fetched here.
+    """
 
     # Get data for each month.
-    api_data = []
-    for month_date in months:
-        api_data.append(RecreationClient.get_availability(park_id, month_date))
+    if api_data is None:
+        api_data = [
+            get_month_availability(park_id, month_date)
+            for month_date in get_months(start_date, end_date)
+        ]
 
     # Collapse the data into the described output format.
     # Filter by campsite_type if necessary.
     data = {}
+    campsite_ids = (
+        frozenset(int(c) for c in campsite_ids) if campsite_ids else None
+    )
+    excluded_site_ids = frozenset(excluded_site_ids)
 
     for month_data in api_data:
         for campsite_id, campsite_data in month_data["campsites"].items():
             if campsite_id in excluded_site_ids:
                 continue
-            available = []
             a = data.setdefault(campsite_id, [])
-            for date, availability_value in campsite_data[
-                "availabilities"
-            ].items():
-                if availability_value != "Available":
-                    continue
 
-                if (
-                    campsite_type
-                    and campsite_type != campsite_data["campsite_type"]
-                ):
+            # These filters only depend on the site, so check them once here
+            # rather than for every date.
+            if (
+                campsite_type
+                and campsite_type != campsite_data["campsite_type"]
+            ):
+                continue
+            if campsite_ids is not None:
+                cs_id_int = int(campsite_data["campsite_id"])
+                if cs_id_int not in campsite_ids:
                     continue
 
-                if (
-                    len(campsite_ids) > 0
-                    and int(campsite_data["campsite_id"]) not in campsite_ids
-                ):
+            for day, availability_value in campsite_data[
+                "availabilities"
+            ].items():
+                if availability_value != "Available":
                     continue
-
-                available.append(date)
-            if available:
-                a += available
+                a.append(day)
 
     return data
 
-def is_weekend(date):
-    weekday = date.weekday()
+def is_weekend(day):
+    weekday = day.weekday()
 
     return weekday == 4 or weekday == 5
 
@@ -110,15 +210,12 @@ def get_num_available_sites(
 
     num_available = 0
     num_days = (end_date - start_date).days
-    dates = [end_date - timedelta(days=i) for i in range(1, num_days + 1)]
+    start_ordinal = start_date.toordinal()
+    days = range(start_ordinal, start_ordinal + num_days)
     if weekends_only:
-        dates = filter(is_weekend, dates)
-    dates = set(
-        formatter.format_date(
-            i, format_string=DateFormat.ISO_DATE_FORMAT_RESPONSE.value
-        )
-        for i in dates
-    )
+        days = (o for o in days if is_weekend(date.fromordinal(o)))
+    # Keys in the API's ISO_DATE_FORMAT_RESPONSE, e.g. 2022-06-22T00:00:00Z.
+    dates = {date.fromordinal(o).isoformat() + "T00:00:00Z" for o in days}
 
     if nights not in range(1, num_days + 1):
         nights = num_days
@@ -129,10 +226,10 @@ def get_num_available_sites(
         # List of dates that are in the desired range for this site.
         desired_available = []
 
-        for date in availabilities:
-            if date not in dates:
+        for day in availabilities:
+            if day not in dates:
                 continue
-            desired_available.append(date)
+            desired_available.append(day)
 
         if not desired_available:
             continue
@@ -163,48 +260,73 @@ def consecutive_nights(available, nights):
     date range for this site that is available.
     """
     ordinal_dates = [
-        datetime.strptime(
-            dstr, DateFormat.ISO_DATE_FORMAT_RESPONSE.value
-        ).toordinal()
-        for dstr in available
+        formatter.parse_response_date(dstr).toordinal() for dstr in available
     ]
-    c = count()
-
-    consecutive_ranges = list(
-        list(g) for _, g in groupby(ordinal_dates, lambda x: x - next(c))
-    )
+    # Every start/end we can emit is an available night or the morning after
+    # one, so format each of those once instead of once per range.
+    nice_by_ordinal = {
+        o: formatter.format_date(
+            datetime.fromordinal(o),
+            format_string=DateFormat.INPUT_DATE_FORMAT.value,
+        )
+        for o in set(ordinal_dates) | {o + 1 for o in ordinal_dates}
+    }
+    # Split into runs of consecutive days.
+    consecutive_ranges = []
+    current = []
+    for o in ordinal_dates:
+        if current and o != current[-1] + 1:
+            consecutive_ranges.append(current)
+            current = []
+        current.append(o)
+    if current:
+        consecutive_ranges.append(current)
 
     long_enough_consecutive_ranges = []
     for r in consecutive_ranges:
         # Skip ranges that are too short.
         if len(r) < nights:
             continue
-        for start_index in range(0, len(r) - nights + 1):
-            start_nice = formatter.format_date(
-                datetime.fromordinal(r[start_index]),
-                format_string=DateFormat.INPUT_DATE_FORMAT.value,
-            )
-            end_nice = formatter.format_date(
-                datetime.fromordinal(r[start_index + nights - 1] + 1),
-                format_string=DateFormat.INPUT_DATE_FORMAT.value,
-            )
-            long_enough_consecutive_ranges.append((start_nice, end_nice))
+        # Each start night pairs with the last night of its stay, so slice
+        # both ends of the run instead of indexing per start.
+        starts = r[: len(r) - nights + 1]
+        last_nights = r[nights - 1 :]
+        long_enough_consecutive_ranges.extend(
+            (nice_by_ordinal[start], nice_by_ordinal[last + 1])
+            for start, last in zip(starts, last_nights)
+        )
 
     return long_enough_consecutive_ranges
 
 
 def check_park(
-    park_id, start_date, end_date, campsite_type, campsite_ids=(), nights=None, weekends_only=False, excluded_site_ids=[],
+    park_id,
+    start_date,
+    end_date,
+    campsite_type,
+    campsite_ids=(),
+    nights=None,
+    weekends_only=False,
+    excluded_site_ids=frozenset(),
+    api_data=None,
+    park_name=None,
 ):
     park_information = get_park_information(
-        park_id, start_date, end_date, campsite_type, campsite_ids, excluded_site_ids=excluded_site_ids,
+        park_id,
+        start_date,
+        end_date,
+        campsite_type,
+        campsite_ids,
+        excluded_site_ids=excluded_site_ids,
+        api_data=api_data,
     )
     LOG.debug(
         "Information for park {}: {}".format(
             park_id, json.dumps(park_information, indent=2)
         )
     )
-    park_name = RecreationClient.get_park_name(park_id)
+    if park_name is None:
+        park_name = get_park_name(park_id)
     current, maximum, availabilities_filtered = get_num_available_sites(
         park_information, start_date, end_date, nights=nights, weekends_only=weekends_only,
     )
@@ -247,10 +369,10 @@ def generate_human_output(
                         site_id=site_id
                     )
                 )
-                for date in dates:
+                for day in dates:
                     out.append(
                         "    * {start} -> {end}".format(
-                            start=date["start"], end=date["end"]
+                            start=day["start"], end=day["end"]
                         )
                     )
 
@@ -279,7 +401,10 @@ def generate_json_output(info_by_park_id):
                 "sites": available_dates_by_site_id,
             }
 
-    return json.dumps(availabilities_by_park_id), has_availabilities
+    output = orjson.dumps(
+        availabilities_by_park_id, option=orjson.OPT_NON_STR_KEYS
+    ).decode()
+    return output, has_availabilities
 
 
 def remove_comments(lines: list[str]) -> list[str]:
@@ -296,34 +421,89 @@ def remove_comments(lines: list[str]) -> list[str]:
     return new_lines
 
 
+@lru_cache(maxsize=8)
+def load_excluded_site_ids(path, mtime):
+    """
+    Reads the site IDs from an exclusion file. `mtime` is only part of the
+    cache key, so an edited file is read again.
+    """
+    with open(path, "r") as f:
+        lines = [l.strip() for l in f.readlines()]
+    return frozenset(remove_comments(lines))
+
+
 def main(parks, json_output=False):
     SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
     CAMPSITES_JSON = os.path.join(SCRIPT_DIR, "campsites.json")
+    CAMPSITES_JSON_HASH = CAMPSITES_JSON + ".hash"
+    TELEGRAM_LAST_SENT = os.path.join(SCRIPT_DIR, "telegram.last_sent")
     print(f"Campsite JSON file: {CAMPSITES_JSON}")
     print(f"Parks: {parks}")
     print(f"Duration: {args.start_date} to {args.end_date}")
 
-    excluded_site_ids = []
+    excluded_site_ids = frozenset()
 
     if args.exclusion_file:
-        with open(args.exclusion_file, "r") as f:
-            excluded_site_ids = f.readlines()
-            excluded_site_ids = [l.strip() for l in excluded_site_ids]
-            excluded_site_ids = remove_comments(excluded_site_ids)
-
-    info_by_park_id = {}
-    for park_id in parks:
-        info_by_park_id[park_id] = check_park(
-            park_id,
-            args.start_date,
-            args.end_date,
-            args.campsite_type,
-            args.campsite_ids,
-            nights=args.nights,
-            weekends_only=args.weekends_only,
-            excluded_site_ids=excluded_site_ids,
+        excluded_site_ids = load_excluded_site_ids(
+            args.exclusion_file, os.path.getmtime(args.exclusion_file)
         )
 
+    # Queue every request for every park up front on one bounded pool, so at
+    # most MAX_WORKERS requests are in flight at once. Each park is processed
+    # as soon as its own months arrive.
+    months = get_months(args.start_date, args.end_date)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        try:
+            month_futures = {
+                park_id: [
+                    executor.submit(
+                        get_month_availability,
+                        park_id,
+                        month_date,
+                        args.cache_ttl,
+                    )
+                    for month_date in months
+                ]
+                for park_id in parks
+            }
+            park_name_futures = {
+                park_id: executor.submit(get_park_name, park_id)
+                for park_id in parks
+            }
+            info_by_park_id = {
+                park_id: check_park(
+                    park_id,
+                    args.start_date,
+                    args.end_date,
+                    args.campsite_type,
+                    args.campsite_ids,
+                    nights=args.nights,
+                    weekends_only=args.weekends_only,
+                    excluded_site_ids=excluded_site_ids,
+                    api_data=[f.result() for f in month_futures[park_id]],
+                    park_name=park_name_futures[park_id].result(),
+                )
+                for park_id in parks
+            }
+        except BaseException:
+            # Fail as soon as one park does, rather than after every other
+            # queued request has run.
+            executor.shutdown(cancel_futures=True)
+            raise
+
+    has_availabilities = any(info[0] for info in info_by_park_id.values())
+
+    # campsites.json.hash holds a fingerprint of the availability behind the
+    # last campsites.json written. If nothing changed since, skip building
+    # the outputs and reading campsites.json altogether.
+    new_hash = availability_fingerprint(info_by_park_id)
+    if (
+        os.path.exists(CAMPSITES_JSON)
+        and read_hash(CAMPSITES_JSON_HASH) == new_hash
+    ):
+        print("No differences found in campsites.json.")
+        return has_availabilities
+
     output, has_availabilities = generate_json_output(info_by_park_id)
 
     msg, has_availabilities = generate_human_output(
@@ -333,14 +513,18 @@ def main(parks, json_output=False):
         args.show_campsite_info,
     )
 
+    new_json_data = orjson.loads(output)
+    pretty_output = orjson.dumps(
+        new_json_data, option=orjson.OPT_INDENT_2
+    ).decode()
+
     # If campsites.json exists, compare old data with new output by parsing JSON data
     if os.path.exists(CAMPSITES_JSON):
-        with open(CAMPSITES_JSON, "r") as old_file:
+        with open(CAMPSITES_JSON, "rb") as old_file:
             try:
-                old_json_data = json.load(old_file)
-            except json.JSONDecodeError:
+                old_json_data = orjson.loads(old_file.read())
+            except orjson.JSONDecodeError:
                 old_json_data = None
-        new_json_data = json.loads(output)
         if old_json_data != new_json_data:
             print("Differences found in campsites.json:")
             print(output)
@@ -348,7 +532,6 @@ def main(parks, json_output=False):
             print(msg)
     
             # Prettify JSON output and write it to a file named "campsites.json"
-            pretty_output = json.dumps(new_json_data, indent=4)
             with open(CAMPSITES_JSON, "w") as json_file:
                 json_file.write(pretty_output)
             
@@ -356,17 +539,50 @@ def main(parks, json_output=False):
             title = f"*Changed campsites availability*\n"
             message = title + escape_markdown(msg)
             if args.chat_id and args.bot_token:
-                send_telegram_message(args.chat_id, args.bot_token, message)
+                sent = send_telegram_message_once(
+                    TELEGRAM_LAST_SENT, args.chat_id, args.bot_token, message
+                )
+                if not sent:
+                    print("Same notification was just sent, not sending again.")
         else:
             print("No differences found in campsites.json.")
     else:
         # Prettify JSON output and write it to a file named "campsites.json"
-        pretty_output = json.dumps(output, indent=4)
         with open(CAMPSITES_JSON, "w") as json_file:
             json_file.write(pretty_output)
-    
+
+    # Only recorded once campsites.json is up to date, so a failed run is
+    # retried rather than skipped.
+    with open(CAMPSITES_JSON_HASH, "w") as hash_file:
+        hash_file.write(new_hash)
+
     return has_availabilities
 
+
+def availability_fingerprint(info_by_park_id):
+    """
+    Hashes the park names and available dates that campsites.json is built
+    from. Keys are sorted so equal data always hashes the same.
+    """
+    return hashlib.blake2b(
+        orjson.dumps(
+            [
+                (park_id, info[3], info[2])
+                for park_id, info in info_by_park_id.items()
+            ],
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS,
+        ),
+        digest_size=16,
+    ).hexdigest()
+
+
+def read_hash(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
 def send_telegram_message(chat_id, bot_token, message):
     url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
     data = {
@@ -374,22 +590,67 @@ def send_telegram_message(chat_id, bot_token, message):
         "text": message,
         "parse_mode": "MarkdownV2"
     }
-    response = requests.post(url, data=data)
+    response = HTTP.post(url, data=data, timeout=REQUEST_TIMEOUT)
     try:
         response.raise_for_status()
     except requests.exceptions.HTTPError as e:
         print(f"Error sending message to Telegram: {e.response.text}")
         raise
 
+def send_telegram_message_once(path, chat_id, bot_token, message):
+    """
+    Sends `message` unless the same one was sent less than
+    `TELEGRAM_DEBOUNCE` seconds ago, according to the record in `path`.
+    Returns whether it was sent.
+
+    The record is locked from the check until after the send, so overlapping
+    cron runs that found the same change can't both send it.
+    """
+    message_hash = hashlib.blake2b(message.encode(), digest_size=16).hexdigest()
+    with open(path, "a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        try:
+            sent_at, sent_hash = f.read().split()
+            recently_sent = (
+                sent_hash == message_hash
+                and time.time() - float(sent_at) < TELEGRAM_DEBOUNCE
+            )
+        except ValueError:
+            recently_sent = False
+        if recently_sent:
+            return False
+
+        send_telegram_message(chat_id, bot_token, message)
+        f.seek(0)
+        f.truncate()
+        f.write("{} {}".format(time.time(), message_hash))
+    return True
+
+
 def escape_markdown(text):
     """Escape markdown characters."""
-    escape_chars = [ '_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!' ]
-    for char in escape_chars:
-        text = text.replace(char, f"\\{char}")
-    return text
+    return MARKDOWN_ESCAPE_RE.sub(r"\\\1", text)
 
-if __name__ == "__main__":
+
+def build_argument_parser():
+    """Adds the options only this script uses to the shared parser."""
     parser = CampingArgumentParser()
+    parser.add_argument(
+        "--cache-ttl",
+        type=int,
+        default=LIVE_MONTH_TTL,
+        help=(
+            "Seconds to reuse cached availability for current and future "
+            "months before checking recreation.gov again (default "
+            "%(default)s, check on every run)"
+        ),
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    parser = build_argument_parser()
     args = parser.parse_args()
 
     print(datetime.now(), "-" * 80)
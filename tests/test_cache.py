@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from utils import cache
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(cache, "CACHE_DIR", self.tmp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def testLoad_ReturnsDumpedValue(self):
+        cache.dump("key", {"campsites": {"1": []}})
+        self.assertEqual(cache.load("key", 60), {"campsites": {"1": []}})
+
+    def testLoad_MissingKeyReturnsNone(self):
+        self.assertIsNone(cache.load("missing", 60))
+
+    def testLoad_ExpiredEntryReturnsNone(self):
+        cache.dump("key", {})
+        path = cache.cache_path("key")
+        old = os.path.getmtime(path) - 120
+        os.utime(path, (old, old))
+        self.assertIsNone(cache.load("key", 60))
+
+    def testLoad_WithoutTtlReturnsExpiredEntry(self):
+        cache.dump("key", {"etag": "abc"})
+        path = cache.cache_path("key")
+        old = os.path.getmtime(path) - 120
+        os.utime(path, (old, old))
+        self.assertEqual(cache.load("key"), {"etag": "abc"})
+
+    def testTouch_MakesExpiredEntryFresh(self):
+        cache.dump("key", {})
+        path = cache.cache_path("key")
+        old = os.path.getmtime(path) - 120
+        os.utime(path, (old, old))
+        cache.touch("key")
+        self.assertTrue(cache.is_fresh("key", 60))
+
+
+if __name__ == "__main__":
+    unittest.main()
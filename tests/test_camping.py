@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 
 import camping
@@ -34,6 +36,58 @@ class TestCamping(unittest.TestCase):
         self.assertTrue(2 in available_dates_by_campsite_id)
         self.assertTrue(3 in available_dates_by_campsite_id)
 
+    def testGetNumAvailableSites_WeekendsOnlyKeepsFridayAndSaturday(self):
+        park_info = {
+            "1": [
+                "2022-06-23T00:00:00Z",
+                "2022-06-24T00:00:00Z",
+                "2022-06-25T00:00:00Z",
+                "2022-06-26T00:00:00Z",
+            ],
+        }
+
+        _, _, available_dates_by_campsite_id = camping.get_num_available_sites(
+            park_info,
+            CampingArgumentParser.TypeConverter.date("2022-06-20"),
+            CampingArgumentParser.TypeConverter.date("2022-06-27"),
+            nights=1,
+            weekends_only=True,
+        )
+
+        self.assertEqual(
+            available_dates_by_campsite_id[1],
+            [
+                {"start": "2022-06-24", "end": "2022-06-25"},
+                {"start": "2022-06-25", "end": "2022-06-26"},
+            ],
+        )
+
+    def testConsecutiveNights_FindsEveryStartInLongEnoughRuns(self):
+        available = [
+            "2022-06-22T00:00:00Z",
+            "2022-06-23T00:00:00Z",
+            "2022-06-24T00:00:00Z",
+            "2022-06-26T00:00:00Z",
+        ]
+
+        ranges = camping.consecutive_nights(available, 2)
+
+        self.assertEqual(
+            ranges,
+            [("2022-06-22", "2022-06-24"), ("2022-06-23", "2022-06-25")],
+        )
+
+    def testLoadExcludedSiteIds_SkipsCommentsAndBlankLines(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("# group sites\n18621\n\n18654 # too close to the road\n")
+        self.addCleanup(os.remove, f.name)
+
+        excluded = camping.load_excluded_site_ids(
+            f.name, os.path.getmtime(f.name)
+        )
+
+        self.assertEqual(excluded, frozenset({"18621", "18654"}))
+
     def testGenerateOutputToHuman_DefaultOutputWithAvailabilities(self):
         start_date = CampingArgumentParser.TypeConverter.date("2022-06-01")
         end_date = CampingArgumentParser.TypeConverter.date("2022-07-01")
@@ -0,0 +1,107 @@
+import io
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from urllib3 import HTTPResponse
+from urllib3.connectionpool import HTTPSConnectionPool
+
+from clients.http_session import REQUEST_TIMEOUT
+from clients.recreation_client import RecreationClient
+
+
+def make_response(status_code, content=b"", headers=None):
+    resp = mock.Mock(status_code=status_code, content=content, text="")
+    resp.headers = headers or {}
+    return resp
+
+
+class TestRecreationClient(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(RecreationClient.session, "get")
+        self.get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def testGetAvailabilityIfModified_SendsValidators(self):
+        self.get.return_value = make_response(304)
+
+        RecreationClient.get_availability_if_modified(
+            1, datetime(2022, 6, 1), etag='"abc"', last_modified="yesterday"
+        )
+
+        headers = self.get.call_args.kwargs["headers"]
+        self.assertEqual(headers["If-None-Match"], '"abc"')
+        self.assertEqual(headers["If-Modified-Since"], "yesterday")
+        self.assertIn("User-Agent", headers)
+        self.assertEqual(self.get.call_args.kwargs["timeout"], REQUEST_TIMEOUT)
+
+    def testGetAvailabilityIfModified_NoValidatorsSendsPlainRequest(self):
+        self.get.return_value = make_response(200, b"{}")
+
+        RecreationClient.get_availability_if_modified(1, datetime(2022, 6, 1))
+
+        headers = self.get.call_args.kwargs["headers"]
+        self.assertNotIn("If-None-Match", headers)
+        self.assertNotIn("If-Modified-Since", headers)
+
+    def testGetAvailabilityIfModified_NotModifiedKeepsOldValidators(self):
+        self.get.return_value = make_response(304)
+
+        result = RecreationClient.get_availability_if_modified(
+            1, datetime(2022, 6, 1), etag='"abc"', last_modified="yesterday"
+        )
+
+        self.assertEqual(result, (None, '"abc"', "yesterday"))
+
+    def testGetAvailabilityIfModified_NewBodyDropsOldValidators(self):
+        self.get.return_value = make_response(200, b'{"campsites": {}}')
+
+        result = RecreationClient.get_availability_if_modified(
+            1, datetime(2022, 6, 1), etag='"abc"', last_modified="yesterday"
+        )
+
+        self.assertEqual(result, ({"campsites": {}}, None, None))
+
+    def testGetAvailabilityIfModified_ErrorStatusRaises(self):
+        self.get.return_value = make_response(500)
+
+        with self.assertRaises(RuntimeError):
+            RecreationClient.get_availability_if_modified(
+                1, datetime(2022, 6, 1)
+            )
+
+
+class TestHttpSession(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(
+            HTTPSConnectionPool, "_make_request", side_effect=self.rate_limit
+        )
+        self.make_request = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("urllib3.util.retry.time.sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def rate_limit(*args, **kwargs):
+        return HTTPResponse(
+            body=io.BytesIO(b"slow down"),
+            headers={"Retry-After": "3600"},
+            status=429,
+            preload_content=False,
+            request_method="GET",
+        )
+
+    def testRateLimited_RetriesThenRaisesFailedRequest(self):
+        with self.assertRaises(RuntimeError) as cm:
+            RecreationClient.get_availability(1, datetime(2022, 6, 1))
+
+        self.assertEqual(cm.exception.args[0], "failedRequest")
+        self.assertIn("429", cm.exception.args[1])
+        self.assertEqual(self.make_request.call_count, 4)
+        for call in self.sleep.call_args_list:
+            self.assertLess(call.args[0], 3600)
+
+
+if __name__ == "__main__":
+    unittest.main()
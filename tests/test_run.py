@@ -0,0 +1,178 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import run
+from clients.recreation_client import RecreationClient
+from utils import cache
+
+
+def make_response(status_code, content=b"", headers=None):
+    resp = mock.Mock(status_code=status_code, content=content, text="")
+    resp.headers = headers or {}
+    return resp
+
+
+class TestGetMonthAvailability(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        for patcher in (
+            mock.patch.object(cache, "CACHE_DIR", self.tmp_dir.name),
+            mock.patch.object(RecreationClient.session, "get"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.get = RecreationClient.session.get
+        # Far enough ahead to always be a live month.
+        self.month = datetime(datetime.today().year + 1, 6, 1)
+        self.key = "availability-1-{:%Y-%m}".format(self.month)
+
+    def make_stale(self):
+        path = cache.cache_path(self.key)
+        old = os.path.getmtime(path) - 120
+        os.utime(path, (old, old))
+
+    def testFreshEntry_IsServedWithoutRequest(self):
+        cache.dump(self.key, {"data": {"campsites": {}}, "etag": '"abc"'})
+
+        data = run.get_month_availability(1, self.month, live_ttl=60)
+
+        self.assertEqual(data, {"campsites": {}})
+        self.get.assert_not_called()
+
+    def testStaleEntry_NotModifiedReusesAndTouchesEntry(self):
+        cache.dump(self.key, {"data": {"campsites": {}}, "etag": '"abc"'})
+        self.make_stale()
+        self.get.return_value = make_response(304)
+
+        data = run.get_month_availability(1, self.month, live_ttl=60)
+
+        self.assertEqual(data, {"campsites": {}})
+        headers = self.get.call_args.kwargs["headers"]
+        self.assertEqual(headers["If-None-Match"], '"abc"')
+        self.assertTrue(cache.is_fresh(self.key, 60))
+
+    def testStaleEntry_ModifiedIsStoredWithNewValidators(self):
+        cache.dump(self.key, {"data": {"campsites": {}}, "etag": '"abc"'})
+        self.make_stale()
+        self.get.return_value = make_response(
+            200, b'{"campsites": {"1": {}}}', {"ETag": '"def"'}
+        )
+
+        data = run.get_month_availability(1, self.month, live_ttl=60)
+
+        self.assertEqual(data, {"campsites": {"1": {}}})
+        self.assertEqual(
+            cache.load(self.key),
+            {"data": data, "etag": '"def"', "last_modified": None},
+        )
+
+    def testZeroTtl_AlwaysRevalidates(self):
+        cache.dump(self.key, {"data": {"campsites": {}}, "etag": '"abc"'})
+        self.get.return_value = make_response(304)
+
+        run.get_month_availability(1, self.month, live_ttl=0)
+
+        self.get.assert_called_once()
+
+    def testZeroTtlWithoutValidators_IsNotStored(self):
+        self.get.return_value = make_response(200, b'{"campsites": {}}')
+
+        data = run.get_month_availability(1, self.month, live_ttl=0)
+
+        self.assertEqual(data, {"campsites": {}})
+        self.assertIsNone(cache.load(self.key))
+
+    def testPositiveTtlWithoutValidators_IsStored(self):
+        self.get.return_value = make_response(200, b'{"campsites": {}}')
+
+        run.get_month_availability(1, self.month, live_ttl=60)
+        run.get_month_availability(1, self.month, live_ttl=60)
+
+        self.get.assert_called_once()
+
+
+class TestAvailabilityFingerprint(unittest.TestCase):
+    def testSameDataInDifferentSiteOrder_HashesTheSame(self):
+        dates = [{"start": "2022-06-22", "end": "2022-06-23"}]
+        first = {1: (2, 3, {18621: dates, 18654: dates}, "SOME PARK")}
+        second = {1: (2, 3, {18654: dates, 18621: dates}, "SOME PARK")}
+
+        self.assertEqual(
+            run.availability_fingerprint(first),
+            run.availability_fingerprint(second),
+        )
+
+    def testParkNameChange_ChangesHash(self):
+        dates = {18621: [{"start": "2022-06-22", "end": "2022-06-23"}]}
+
+        self.assertNotEqual(
+            run.availability_fingerprint({1: (1, 3, dates, "OLD NAME")}),
+            run.availability_fingerprint({1: (1, 3, dates, "NEW NAME")}),
+        )
+
+
+class TestSendTelegramMessageOnce(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = os.path.join(self.tmp_dir.name, "telegram.last_sent")
+        patcher = mock.patch.object(run, "send_telegram_message")
+        self.send = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def testSameMessageTwice_IsOnlySentOnce(self):
+        send_once = run.send_telegram_message_once
+        self.assertTrue(send_once(self.path, 1, "t", "hi"))
+        self.assertFalse(send_once(self.path, 1, "t", "hi"))
+        self.send.assert_called_once_with(1, "t", "hi")
+
+    def testDifferentMessage_IsSent(self):
+        run.send_telegram_message_once(self.path, 1, "t", "hi")
+        self.assertTrue(
+            run.send_telegram_message_once(self.path, 1, "t", "bye")
+        )
+        self.assertEqual(self.send.call_count, 2)
+
+    def testSameMessageAfterDebounce_IsSentAgain(self):
+        run.send_telegram_message_once(self.path, 1, "t", "hi")
+        with mock.patch.object(run, "TELEGRAM_DEBOUNCE", 0):
+            self.assertTrue(
+                run.send_telegram_message_once(self.path, 1, "t", "hi")
+            )
+
+    def testFailedSend_IsNotRecorded(self):
+        self.send.side_effect = RuntimeError
+        with self.assertRaises(RuntimeError):
+            run.send_telegram_message_once(self.path, 1, "t", "hi")
+        self.send.side_effect = None
+        self.assertTrue(run.send_telegram_message_once(self.path, 1, "t", "hi"))
+
+
+class TestBuildArgumentParser(unittest.TestCase):
+    def setUp(self):
+        self.args = [
+            "--start-date",
+            "2022-01-01",
+            "--end-date",
+            "2022-01-02",
+            "--parks",
+            "111",
+        ]
+
+    def testCacheTtl_DefaultsToLiveMonthTtl(self):
+        args = run.build_argument_parser().parse_args(self.args)
+        self.assertEqual(args.cache_ttl, run.LIVE_MONTH_TTL)
+
+    def testCacheTtl_CanBeSet(self):
+        args = run.build_argument_parser().parse_args(
+            self.args + ["--cache-ttl", "600"]
+        )
+        self.assertEqual(args.cache_ttl, 600)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+
+import orjson
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "campsite")
+
+
+def cache_path(key):
+    return os.path.join(CACHE_DIR, "{}.json".format(key))
+
+
+def is_fresh(key, ttl):
+    """
+    Returns True if there is an entry for `key` written (or touched) within
+    the last `ttl` seconds.
+    """
+    try:
+        return time.time() - os.path.getmtime(cache_path(key)) < ttl
+    except OSError:
+        return False
+
+
+def load(key, ttl=None):
+    """
+    Returns the cached value for `key`, or None if there is no entry or it
+    was written more than `ttl` seconds ago. With no `ttl`, entries of any
+    age are returned.
+    """
+    path = cache_path(key)
+    try:
+        if ttl is not None and not is_fresh(key, ttl):
+            return None
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def dump(key, value):
+    """
+    Writes `value` to the cache. The file is written under a temporary name
+    and then renamed so concurrent readers never see a partial entry.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = cache_path(key)
+    tmp_path = "{}.{}.{}.tmp".format(
+        path, os.getpid(), threading.get_ident()
+    )
+    with open(tmp_path, "wb") as f:
+        f.write(orjson.dumps(value))
+    os.replace(tmp_path, path)
+
+
+def touch(key):
+    """Marks the entry for `key` as freshly written without rewriting it."""
+    try:
+        os.utime(cache_path(key))
+    except OSError:
+        pass
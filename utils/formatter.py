@@ -1,4 +1,5 @@
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
 
 from enums.date_format import DateFormat
 
@@ -21,3 +22,12 @@ def site_date_to_human_date(date_string):
     return format_date(
         date_object, format_string=DateFormat.INPUT_DATE_FORMAT.value
     )
+
+
+@lru_cache(maxsize=4096)
+def parse_response_date(date_string):
+    """
+    Parses a date in the API's response format. The same handful of dates
+    shows up for every campsite, so parse each one only once.
+    """
+    return date.fromisoformat(date_string[:10])